@@ -5,6 +5,7 @@ Fetches and caches ALL Kalshi markets in memory
 """
 
 import asyncio
+import itertools
 import time
 import logging
 from typing import Dict, List, Optional
@@ -12,22 +13,54 @@ from simple_kalshi_client import SimpleKalshiClient
 
 logger = logging.getLogger(__name__)
 
+# Category rules for _categorize_market, checked in priority order
+POLITICS_TICKER_PATTERNS = ('potus', 'pres', 'elect', 'senat')
+POLITICS_TITLE_PATTERNS = (
+    'potus', 'president', 'election', 'senate', 'congress', 'vote',
+    'approval rating', 'trump', 'biden', 'harris', 'desantis',
+    'pres-', 'elect', 'approval', 'supreme court'
+)
+CRYPTO_PATTERNS = ('btc', 'eth', 'crypto', 'bitcoin', 'ethereum')
+SPORTS_TICKER_PATTERNS = ('nfl', 'mlb', 'nba', 'ufc', 'pga', 'f1', 'uefa')
+SPORTS_TITLE_PATTERNS = ('championship', 'tournament', 'game', 'match', 'win', 'mvp', 'draft')
+WEATHER_PATTERNS = ('temperature', 'weather', 'snow', 'rain', 'hurricane', 'storm', 'temp')
+
+# Title keywords for the summary counts printed by _print_stats
+STATS_KEYWORDS = (
+    ('politics', ('election', 'president', 'trump', 'biden', 'vote', 'senate', 'congress', 'potus')),
+    ('sports', ('nfl', 'mlb', 'nba', 'game', 'championship', 'ufc', 'pga', 'match', 'tournament')),
+    ('crypto', ('bitcoin', 'btc', 'crypto', 'ethereum', 'eth')),
+    ('weather', ('temperature', 'weather', 'snow', 'rain', 'hurricane'))
+)
+
 class SimpleMarketCache:
     """Simple in-memory cache for all Kalshi markets"""
     
-    def __init__(self, api_key: str, private_key_path: str):
+    def __init__(self, api_key: str, private_key_path: str, client: Optional[SimpleKalshiClient] = None):
         self.api_key = api_key
         self.private_key_path = private_key_path
         self.markets: List[Dict] = []
+        
+        # Query indexes over self.markets, rebuilt on every update
+        self._lower_titles: List[str] = []
+        self._lower_tickers: List[str] = []
+        self._category_index: Dict[str, List[int]] = {}
         self.last_update: float = 0
         self.update_interval = 300  # 5 minutes
-        self.client: Optional[SimpleKalshiClient] = None
-        self.updating = False
+        
+        # Reuse the caller's client (and its connection pool) when one is given
+        self.client: Optional[SimpleKalshiClient] = client
+        self._owns_client = client is None
+        
+        # Set to request an update before the next interval; the lock keeps updates from overlapping
+        self._refresh_event = asyncio.Event()
+        self._update_lock = asyncio.Lock()
     
     async def start(self):
         """Start the cache and do initial load"""
-        self.client = SimpleKalshiClient(self.api_key, self.private_key_path)
-        await self.client.__aenter__()
+        if self._owns_client:
+            self.client = SimpleKalshiClient(self.api_key, self.private_key_path)
+            await self.client.__aenter__()
         
         # Initial load
         await self.update_markets()
@@ -38,79 +71,106 @@ class SimpleMarketCache:
     
     async def stop(self):
         """Stop the cache and cleanup"""
-        if self.client:
+        if self.client and self._owns_client:
             await self.client.__aexit__(None, None, None)
     
     async def _background_update(self):
         """Background task to periodically update markets"""
         while True:
             try:
-                await asyncio.sleep(self.update_interval)
-                if not self.updating:
-                    await self.update_markets()
+                try:
+                    await asyncio.wait_for(self._refresh_event.wait(), self.update_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._refresh_event.clear()
+                await self.update_markets()
             except Exception as e:
                 logger.error(f"Background update error: {e}")
     
+    def refresh(self):
+        """Ask the background task to update markets now instead of at the next interval"""
+        self._refresh_event.set()
+    
     async def update_markets(self):
         """Fetch all markets from Kalshi API"""
-        if self.updating or not self.client:
+        # Skip if an update is already in flight rather than queueing a second one
+        if self._update_lock.locked() or not self.client:
             return
         
-        self.updating = True
-        start_time = time.time()
-        
-        try:
-            print("🔄 Updating market cache...")
+        async with self._update_lock:
+            start_time = time.monotonic()
             
-            # Fetch markets in batches with pagination
-            all_markets = []
-            cursor = None
-            batch_count = 0
-            
-            while True:
-                batch_count += 1
-                print(f"📊 Fetching batch {batch_count}...")
+            try:
+                print("🔄 Updating market cache...")
                 
-                # Get batch of markets
-                params = {"limit": 1000, "status": "open"}
-                if cursor:
-                    params["cursor"] = cursor
+                # Fetch markets in batches with pagination
+                all_markets = []
+                cursor = None
+                batch_count = 0
                 
-                data = await self.client.get_markets(**params)
-                markets = data.get("markets", [])
+                # Request the first page up front; each later page is requested as
+                # soon as its cursor is known, so it downloads while this one is handled
+                next_fetch = asyncio.create_task(self.client.get_markets(limit=1000, status="open"))
                 
-                if not markets:
-                    break
+                try:
+                    while True:
+                        batch_count += 1
+                        print(f"📊 Fetching batch {batch_count}...")
+                        
+                        # Get batch of markets
+                        data = await next_fetch
+                        next_fetch = None
+                        markets = data.get("markets", [])
+                        
+                        if not markets:
+                            break
+                        
+                        cursor = data.get("cursor")
+                        if cursor and batch_count < 20:
+                            next_fetch = asyncio.create_task(
+                                self.client.get_markets(limit=1000, status="open", cursor=cursor)
+                            )
+                        
+                        all_markets.extend(markets)
+                        
+                        print(f"📈 Got {len(markets)} markets (total: {len(all_markets)})")
+                        
+                        # If no cursor, we're done
+                        if not cursor:
+                            break
+                        
+                        # Safety limit
+                        if batch_count >= 20:
+                            print("⚠️ Reached batch limit, stopping")
+                            break
+                finally:
+                    # Don't leave a prefetch running if the loop exits early
+                    if next_fetch:
+                        next_fetch.cancel()
                 
-                all_markets.extend(markets)
-                cursor = data.get("cursor")
+                # Lowercase and categorize once per update rather than on every query
+                lower_titles = [m.get('title', '').lower() for m in all_markets]
+                lower_tickers = [m.get('ticker', '').lower() for m in all_markets]
+                category_index: Dict[str, List[int]] = {}
+                for i, (title, ticker) in enumerate(zip(lower_titles, lower_tickers)):
+                    category_index.setdefault(self._categorize_market(title, ticker), []).append(i)
                 
-                print(f"📈 Got {len(markets)} markets (total: {len(all_markets)})")
+                # Update cache
+                self.markets = all_markets
+                self._lower_titles = lower_titles
+                self._lower_tickers = lower_tickers
+                self._category_index = category_index
+                self.last_update = time.time()
                 
-                # If no cursor, we're done
-                if not cursor:
-                    break
+                duration = time.monotonic() - start_time
+                print(f"✅ Market cache updated: {len(self.markets)} markets in {duration:.1f}s")
                 
-                # Safety limit
-                if batch_count >= 20:
-                    print("⚠️ Reached batch limit, stopping")
-                    break
-            
-            # Update cache
-            self.markets = all_markets
-            self.last_update = time.time()
-            
-            duration = time.time() - start_time
-            print(f"✅ Market cache updated: {len(self.markets)} markets in {duration:.1f}s")
-            
-            # Print some stats
-            self._print_stats()
-            
-        except Exception as e:
-            print(f"❌ Market cache update failed: {e}")
-            logger.error(f"Market cache update error: {e}")
-        finally:
-            self.updating = False
+                # Print some stats
+                self._print_stats()
+                
+            except Exception as e:
+                print(f"❌ Market cache update failed: {e}")
+                logger.error(f"Market cache update error: {e}")
     
     def _print_stats(self):
         """Print cache statistics"""
@@ -118,73 +178,57 @@ class SimpleMarketCache:
             return
         
         # Count by category keywords
-        politics = len([m for m in self.markets if any(word in m.get('title', '').lower() 
-                       for word in ['election', 'president', 'trump', 'biden', 'vote', 'senate', 'congress', 'potus'])])
-        
-        sports = len([m for m in self.markets if any(word in m.get('title', '').lower() 
-                     for word in ['nfl', 'mlb', 'nba', 'game', 'championship', 'ufc', 'pga', 'match', 'tournament'])])
-        
-        crypto = len([m for m in self.markets if any(word in m.get('title', '').lower() 
-                     for word in ['bitcoin', 'btc', 'crypto', 'ethereum', 'eth'])])
-        
-        weather = len([m for m in self.markets if any(word in m.get('title', '').lower() 
-                      for word in ['temperature', 'weather', 'snow', 'rain', 'hurricane'])])
+        counts = {
+            name: sum(1 for title in self._lower_titles if any(word in title for word in words))
+            for name, words in STATS_KEYWORDS
+        }
         
         print(f"📊 Market stats:")
         print(f"  📈 Total: {len(self.markets)}")
-        print(f"  🏛️ Politics: {politics}")
-        print(f"  🏈 Sports: {sports}")
-        print(f"  ₿ Crypto: {crypto}")
-        print(f"  🌡️ Weather: {weather}")
+        print(f"  🏛️ Politics: {counts['politics']}")
+        print(f"  🏈 Sports: {counts['sports']}")
+        print(f"  ₿ Crypto: {counts['crypto']}")
+        print(f"  🌡️ Weather: {counts['weather']}")
     
     def get_markets(self, limit: int = 1000, search: str = "", category: str = "all") -> List[Dict]:
         """Get markets from cache with filtering"""
-        markets = self.markets.copy()
+        markets = self.markets
         
-        # Apply search filter
+        # Apply category filter using the index built at update time
+        if category != "all":
+            indices = self._category_index.get(category, [])
+        else:
+            indices = range(len(markets))
+        
+        # Apply search filter against the pre-lowercased titles and tickers
         if search:
             search = search.lower()
-            markets = [m for m in markets if search in m.get('title', '').lower() 
-                      or search in m.get('ticker', '').lower()]
-        
-        # Apply category filter using improved logic
-        if category != "all":
-            markets = [m for m in markets if self._categorize_market(m) == category]
+            titles = self._lower_titles
+            tickers = self._lower_tickers
+            indices = [i for i in indices if search in titles[i] or search in tickers[i]]
         
-        return markets[:limit]
+        return [markets[i] for i in itertools.islice(indices, limit)]
     
-    def _categorize_market(self, market: Dict) -> str:
-        """Categorize a single market with priority-based logic"""
-        title = market.get('title', '').lower()
-        ticker = market.get('ticker', '').lower()
-        
+    def _categorize_market(self, title: str, ticker: str) -> str:
+        """Categorize a single market from its lowercased title and ticker"""
+
         # Politics (highest priority - most specific patterns)
-        politics_patterns = [
-            'potus', 'president', 'election', 'senate', 'congress', 'vote',
-            'approval rating', 'trump', 'biden', 'harris', 'desantis',
-            'pres-', 'elect', 'approval', 'supreme court'
-        ]
-        if any(pattern in ticker for pattern in ['potus', 'pres', 'elect', 'senat']) or \
-           any(pattern in title for pattern in politics_patterns):
+        if any(pattern in ticker for pattern in POLITICS_TICKER_PATTERNS) or \
+           any(pattern in title for pattern in POLITICS_TITLE_PATTERNS):
             return 'politics'
         
         # Crypto (specific ticker patterns)
-        crypto_patterns = ['btc', 'eth', 'crypto', 'bitcoin', 'ethereum']
-        if any(pattern in ticker for pattern in crypto_patterns) or \
-           any(pattern in title for pattern in crypto_patterns):
+        if any(pattern in ticker for pattern in CRYPTO_PATTERNS) or \
+           any(pattern in title for pattern in CRYPTO_PATTERNS):
             return 'crypto'
         
-        # Sports (specific ticker prefixes and common terms)
-        sports_tickers = ['nfl', 'mlb', 'nba', 'ufc', 'pga', 'f1', 'uefa']
-        sports_titles = ['championship', 'tournament', 'game', 'match', 'win', 'mvp', 'draft']
-        if any(ticker.startswith(sport) for sport in sports_tickers) or \
-           any(pattern in ticker for pattern in sports_tickers) or \
-           any(pattern in title for pattern in sports_titles):
+        # Sports (specific ticker patterns and common terms)
+        if any(pattern in ticker for pattern in SPORTS_TICKER_PATTERNS) or \
+           any(pattern in title for pattern in SPORTS_TITLE_PATTERNS):
             return 'sports'
         
         # Weather (specific patterns)
-        weather_patterns = ['temperature', 'weather', 'snow', 'rain', 'hurricane', 'storm', 'temp']
-        if any(pattern in title for pattern in weather_patterns):
+        if any(pattern in title for pattern in WEATHER_PATTERNS):
             return 'weather'
         
         return 'other'
@@ -195,7 +239,7 @@ class SimpleMarketCache:
             "total_markets": len(self.markets),
             "last_update": self.last_update,
             "age_seconds": time.time() - self.last_update if self.last_update else 0,
-            "updating": self.updating
+            "updating": self._update_lock.locked()
         }
 
 
@@ -8,16 +8,47 @@ import asyncio
 import json
 import time
 import logging
+import operator
 import os
+import random
 from typing import Set, Dict, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:  # orjson is optional, stdlib json handles the same messages
+    orjson = None
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 # Import our working Kalshi WebSocket client
 from simple_websocket_client import SimpleKalshiWebSocketClient
 
-app = FastAPI(title="Real-time Kalshi Bridge", version="1.0.0")
+# Log line prefix for each orderbook message type the bridge forwards
+ORDERBOOK_LOG_LABELS = {
+    "orderbook_snapshot": "📋 Orderbook snapshot",
+    "orderbook_delta": "📈 Orderbook delta"
+}
+
+def _utf8_len(message_str: str) -> int:
+    """Encoded size of a message; ASCII strings skip the encode"""
+    return len(message_str) if message_str.isascii() else len(message_str.encode('utf-8'))
+
+# Fields read from every Kalshi ticker message, extracted in one call
+_TICKER_FIELDS = operator.itemgetter('market_ticker', 'yes_bid', 'yes_ask', 'price', 'volume', 'open_interest', 'ts')
+
+app = FastAPI(
+    title="Real-time Kalshi Bridge",
+    version="1.0.0",
+    default_response_class=ORJSONResponse if orjson else JSONResponse
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,9 +59,16 @@ app.add_middleware(
 )
 
 # Global state
-ui_connections: Set[WebSocket] = set()
+# Each UI client gets a bounded outbound queue drained by its own writer task
+UI_QUEUE_SIZE = 256
+UI_SEND_TIMEOUT = 2.0  # Seconds before a stalled UI client is dropped
+UI_MAX_PENDING_BYTES = 4 * 1024 * 1024  # Queued bytes before a slow UI client is disconnected
+TICKER_FLUSH_INTERVAL = 0.02  # Ticker updates within this window go out as one message per market
+ui_connections: Dict[WebSocket, "UIClient"] = {}
+orderbook_subscribers: Dict[str, Set[WebSocket]] = {}  # UI clients subscribed to each market's orderbook
 kalshi_client: Optional[SimpleKalshiWebSocketClient] = None
 latest_data: Dict[str, Dict] = {}  # Cache latest data by market ticker
+latest_encoded: Dict[str, str] = {}  # Encoded form of each entry in latest_data
 
 class KalshiDataBridge:
     """Bridge that connects Kalshi WebSocket to UI clients"""
@@ -39,6 +77,23 @@ class KalshiDataBridge:
         self.running = False
         self.kalshi_client = None
         self.connection_healthy = False
+        
+        # Reconnect delays double from 1s up to 30s; reset once a connection stays up
+        self.reconnect_attempts = 0
+        self._backoff_table = tuple(min(30.0, 1.0 * (1 << i)) for i in range(6))
+        self._stable_connection_seconds = 30.0
+        
+        # Kalshi message types forwarded to the UI, dispatched by a single lookup
+        self._handlers = {
+            "ticker": self._handle_ticker_update,
+            "orderbook_snapshot": self._handle_orderbook,
+            "orderbook_delta": self._handle_orderbook
+        }
+        
+        # Markets with a ticker update waiting for the next flush
+        self._pending_tickers: Dict[str, str] = {}
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
     
     async def start(self):
         """Start the bridge"""
@@ -62,6 +117,10 @@ class KalshiDataBridge:
         self.kalshi_client.on_disconnected = self._on_kalshi_disconnected
         self.kalshi_client.on_error = self._on_kalshi_error
         
+        # Start the ticker flusher
+        self._flush_event = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_tickers())
+        
         # Start connection loop
         while self.running:
             try:
@@ -70,7 +129,12 @@ class KalshiDataBridge:
                 
                 if connected:
                     print("✅ Connected to Kalshi! Starting message listener...")
+                    connected_at = time.monotonic()
                     await self.kalshi_client.listen()
+                    
+                    # A server that accepts and then drops us right away keeps backing off
+                    if time.monotonic() - connected_at >= self._stable_connection_seconds:
+                        self.reconnect_attempts = 0
                 else:
                     print("❌ Failed to connect to Kalshi")
                 
@@ -80,13 +144,19 @@ class KalshiDataBridge:
                 await self._broadcast_status("error", f"Bridge error: {e}")
             
             if self.running:
-                print("🔄 Reconnecting in 5 seconds...")
-                await asyncio.sleep(5)
+                self.reconnect_attempts += 1
+                backoff = self._backoff_table[min(self.reconnect_attempts, len(self._backoff_table)) - 1]
+                # Jitter so restarted bridges don't reconnect in lockstep
+                backoff += random.uniform(0, 0.25 * backoff)
+                print(f"🔄 Reconnecting in {backoff:.1f} seconds...")
+                await asyncio.sleep(backoff)
     
     async def stop(self):
         """Stop the bridge"""
         print("🛑 Stopping bridge...")
         self.running = False
+        if self._flush_task:
+            self._flush_task.cancel()
         if self.kalshi_client:
             await self.kalshi_client.disconnect()
     
@@ -117,13 +187,10 @@ class KalshiDataBridge:
         """Called when we receive a message from Kalshi"""
         try:
             msg_type = data.get("type")
+            handler = self._handlers.get(msg_type)
             
-            if msg_type == "ticker":
-                await self._handle_ticker_update(data)
-            elif msg_type == "orderbook_snapshot":
-                await self._handle_orderbook_snapshot(data)
-            elif msg_type == "orderbook_delta":
-                await self._handle_orderbook_delta(data)
+            if handler:
+                await handler(data)
             elif msg_type == "subscribed":
                 print(f"✅ Subscription confirmed: {data}")
             elif msg_type == "error":
@@ -139,7 +206,18 @@ class KalshiDataBridge:
         """Handle ticker update from Kalshi and forward to UI"""
         try:
             ticker_data = data.get('msg', {})
-            market_ticker = ticker_data.get('market_ticker', '')
+            
+            try:
+                market_ticker, bid, ask, last_price, volume, open_interest, ts = _TICKER_FIELDS(ticker_data)
+            except KeyError:
+                # Rare partial message; fall back to per-field defaults
+                market_ticker = ticker_data.get('market_ticker', '')
+                bid = ticker_data.get('yes_bid', 0)
+                ask = ticker_data.get('yes_ask', 0)
+                last_price = ticker_data.get('price', 0)
+                volume = ticker_data.get('volume', 0)
+                open_interest = ticker_data.get('open_interest', 0)
+                ts = ticker_data['ts'] if 'ts' in ticker_data else int(time.time())
             
             if not market_ticker:
                 return
@@ -149,77 +227,78 @@ class KalshiDataBridge:
                 "type": "ticker",
                 "data": {
                     "market_ticker": market_ticker,
-                    "bid": ticker_data.get('yes_bid', 0),
-                    "ask": ticker_data.get('yes_ask', 0),
-                    "last_price": ticker_data.get('price', 0),
-                    "volume_24h": ticker_data.get('volume', 0),
-                    "open_interest": ticker_data.get('open_interest', 0),
-                    "ts": ticker_data.get('ts', int(time.time()))
+                    "bid": bid,
+                    "ask": ask,
+                    "last_price": last_price,
+                    "volume_24h": volume,
+                    "open_interest": open_interest,
+                    "ts": ts
                 }
             }
             
+            # Encode once; the same string is broadcast now and replayed to new clients
+            data_str = _json_dumps(ui_message["data"])
+            
             # Cache the latest data
             latest_data[market_ticker] = ui_message["data"]
+            latest_encoded[market_ticker] = data_str
             
-            # Broadcast to all UI clients
-            await self._broadcast_to_ui(ui_message)
+            # Broadcast to all UI clients on the next flush, replacing any update still pending
+            self._pending_tickers[market_ticker] = data_str
+            self._flush_event.set()
             
         except Exception as e:
             print(f"Error handling ticker update: {e}")
     
-    async def _handle_orderbook_snapshot(self, data):
-        """Handle orderbook snapshot from Kalshi and forward to UI"""
-        try:
-            orderbook_data = data.get('msg', {})
-            market_ticker = orderbook_data.get('market_ticker', '')
-            
-            if not market_ticker:
-                return
-            
-            # Convert Kalshi orderbook format to our UI format
-            ui_message = {
-                "type": "orderbook_snapshot",
-                "data": {
-                    "market_ticker": market_ticker,
-                    "yes": orderbook_data.get('yes', []),
-                    "no": orderbook_data.get('no', []),
-                    "ts": orderbook_data.get('ts', int(time.time()))
-                }
-            }
+    async def _flush_tickers(self):
+        """Broadcast pending ticker updates, at most one per market per flush interval"""
+        while True:
+            await self._flush_event.wait()
+            await asyncio.sleep(TICKER_FLUSH_INTERVAL)
+            self._flush_event.clear()
             
-            # Broadcast to all UI clients
-            await self._broadcast_to_ui(ui_message)
-            print(f"📋 Orderbook snapshot for {market_ticker}")
+            pending, self._pending_tickers = self._pending_tickers, {}
+            if not pending or not ui_connections:
+                continue
             
-        except Exception as e:
-            print(f"Error handling orderbook snapshot: {e}")
+            # A failed flush only loses this window; the loop keeps running
+            try:
+                if len(pending) == 1:
+                    message_str = '{"type":"ticker","data":' + next(iter(pending.values())) + '}'
+                else:
+                    message_str = '{"type":"ticker_batch","data":[' + ",".join(pending.values()) + ']}'
+                self._send_to_ui(message_str)
+            except Exception as e:
+                print(f"Error flushing ticker updates: {e}")
     
-    async def _handle_orderbook_delta(self, data):
-        """Handle orderbook delta from Kalshi and forward to UI"""
+    async def _handle_orderbook(self, data):
+        """Handle an orderbook snapshot or delta from Kalshi and forward it to subscribed UI clients"""
         try:
+            msg_type = data.get('type')
             orderbook_data = data.get('msg', {})
             market_ticker = orderbook_data.get('market_ticker', '')
             
-            if not market_ticker:
+            # Only clients that asked for this market's orderbook get it
+            subscribers = orderbook_subscribers.get(market_ticker)
+            if not subscribers:
                 return
             
-            # Convert Kalshi orderbook delta format to our UI format
+            # Snapshots and deltas share one UI format; only the type differs
             ui_message = {
-                "type": "orderbook_delta",
+                "type": msg_type,
                 "data": {
                     "market_ticker": market_ticker,
                     "yes": orderbook_data.get('yes', []),
                     "no": orderbook_data.get('no', []),
-                    "ts": orderbook_data.get('ts', int(time.time()))
+                    "ts": orderbook_data['ts'] if 'ts' in orderbook_data else int(time.time())
                 }
             }
             
-            # Broadcast to all UI clients
-            await self._broadcast_to_ui(ui_message)
-            print(f"📈 Orderbook delta for {market_ticker}")
+            await self._broadcast_to_ui(ui_message, subscribers)
+            print(f"{ORDERBOOK_LOG_LABELS[msg_type]} for {market_ticker}")
             
         except Exception as e:
-            print(f"Error handling orderbook delta: {e}")
+            print(f"Error handling {data.get('type')}: {e}")
     
     async def _broadcast_status(self, status: str, message: str):
         """Broadcast status update to UI clients"""
@@ -234,23 +313,70 @@ class KalshiDataBridge:
         }
         await self._broadcast_to_ui(status_message)
     
-    async def _broadcast_to_ui(self, message: Dict):
-        """Broadcast message to all UI WebSocket clients"""
-        if not ui_connections:
-            return
-        
-        message_str = json.dumps(message)
-        disconnected = []
+    async def _broadcast_to_ui(self, message: Dict, recipients: Optional[Set[WebSocket]] = None):
+        """Broadcast message to all UI WebSocket clients, or only to recipients if given"""
+        if ui_connections:
+            self._send_to_ui(_json_dumps(message), recipients)
+    
+    def _send_to_ui(self, message_str: str, recipients: Optional[Set[WebSocket]] = None):
+        """Queue an already-encoded message for all UI WebSocket clients, or only for recipients if given"""
+        if recipients is None:
+            clients = tuple(ui_connections.values())
+        else:
+            clients = tuple(ui_connections[websocket] for websocket in recipients if websocket in ui_connections)
         
-        for websocket in ui_connections.copy():
-            try:
-                await websocket.send_text(message_str)
-            except Exception:
-                disconnected.append(websocket)
+        # Each client's writer task does the actual send, so a slow socket only backs up its own queue
+        size = _utf8_len(message_str)
+        for client in clients:
+            client.enqueue(message_str, size)
+
+class UIClient:
+    """A connected UI WebSocket with a bounded outbound queue drained by its own writer task"""
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=UI_QUEUE_SIZE)
+        self.pending_bytes = 0  # UTF-8 size of messages queued but not yet sent
+        self.writer: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start sending queued messages"""
+        self.writer = asyncio.create_task(self._write())
+    
+    def enqueue(self, message_str: str, size: Optional[int] = None):
+        """Queue a message, dropping the oldest when full; close the client if it falls too far behind"""
+        if size is None:
+            size = _utf8_len(message_str)
+        if self.queue.full():
+            self.pending_bytes -= self.queue.get_nowait()[1]
+        self.queue.put_nowait((message_str, size))
+        self.pending_bytes += size
         
-        # Remove disconnected clients
-        for websocket in disconnected:
-            ui_connections.discard(websocket)
+        # Judge the backlog ahead of this frame, so one large ticker_batch on its own never trips the cap
+        if self.pending_bytes - size > UI_MAX_PENDING_BYTES and self._closing is None:
+            print(f"🐢 UI client {self.pending_bytes} bytes behind, disconnecting")
+            self._closing = asyncio.create_task(self.close(1013))  # 1013: try again later
+    
+    async def _write(self):
+        """Send queued messages until the client disconnects or stalls"""
+        try:
+            while True:
+                message_str, size = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(message_str), UI_SEND_TIMEOUT)
+                self.pending_bytes -= size
+        except Exception:
+            await self.close()
+    
+    async def close(self, code: int = 1000):
+        """Stop routing to this client and close it so its receive loop ends too"""
+        ui_connections.pop(self.websocket, None)
+        if self.writer and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(code), UI_SEND_TIMEOUT)
+        except Exception:
+            pass
 
 # Global bridge instance
 bridge = KalshiDataBridge()
@@ -259,39 +385,43 @@ bridge = KalshiDataBridge()
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for UI clients"""
     await websocket.accept()
-    ui_connections.add(websocket)
     
-    print(f"📱 UI client connected. Total connections: {len(ui_connections)}")
-    
-    # Send welcome message with current status
-    welcome = {
-        "type": "connected",
-        "data": {
-            "message": "Connected to Real-time Kalshi Bridge",
-            "kalshi_connected": bridge.connection_healthy,
-            "cached_markets": len(latest_data)
-        }
-    }
-    await websocket.send_text(json.dumps(welcome))
+    # Register the queue before the backfill so updates that arrive meanwhile are kept;
+    # the finally below unregisters the client even if the welcome or backfill fails
+    client = UIClient(websocket)
+    ui_connections[websocket] = client
+    subscribed_markets: Set[str] = set()  # Markets this client receives orderbooks for
     
-    # Send any cached data
-    for market_ticker, data in latest_data.items():
-        cached_message = {
-            "type": "ticker",
-            "data": data
-        }
-        try:
-            await websocket.send_text(json.dumps(cached_message))
-        except Exception:
-            break
+    print(f"📱 UI client connected. Total connections: {len(ui_connections)}")
     
     try:
+        # Send welcome message with current status
+        welcome = {
+            "type": "connected",
+            "data": {
+                "message": "Connected to Real-time Kalshi Bridge",
+                "kalshi_connected": bridge.connection_healthy,
+                "cached_markets": len(latest_data)
+            }
+        }
+        await websocket.send_text(_json_dumps(welcome))
+        
+        # Send any cached data as one snapshot frame, reusing the strings encoded when each update arrived
+        if latest_encoded:
+            try:
+                await websocket.send_text('{"type":"ticker_snapshot","data":[' + ",".join(latest_encoded.values()) + ']}')
+            except Exception:
+                pass
+        
+        # Everything after the backfill goes through the queue
+        client.start()
+        
         # Keep connection alive and handle client messages
         while True:
             try:
                 # Wait for client messages
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                message = _json_loads(data)
                 
                 # Handle subscription requests
                 if message.get("type") == "subscribe":
@@ -300,6 +430,9 @@ async def websocket_endpoint(websocket: WebSocket):
                     
                     # Handle orderbook subscriptions for specific markets
                     if "orderbook" in channels and market_ticker:
+                        orderbook_subscribers.setdefault(market_ticker, set()).add(websocket)
+                        subscribed_markets.add(market_ticker)
+                        
                         if bridge.kalshi_client:
                             try:
                                 await bridge.kalshi_client.subscribe_to_orderbook([market_ticker])
@@ -316,7 +449,7 @@ async def websocket_endpoint(websocket: WebSocket):
                             "message": f"Subscribed to {channels} for {market_ticker if market_ticker else 'all markets'}"
                         }
                     }
-                    await websocket.send_text(json.dumps(response))
+                    client.enqueue(_json_dumps(response))
                     print(f"📋 UI client subscribed to: {channels} for {market_ticker if market_ticker else 'all markets'}")
                 
             except WebSocketDisconnect:
@@ -328,7 +461,15 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         pass
     finally:
-        ui_connections.discard(websocket)
+        ui_connections.pop(websocket, None)
+        if client.writer:
+            client.writer.cancel()
+        for market_ticker in subscribed_markets:
+            subscribers = orderbook_subscribers.get(market_ticker)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del orderbook_subscribers[market_ticker]
         print(f"📤 UI client disconnected. Total connections: {len(ui_connections)}")
 
 @app.get("/")
@@ -364,4 +505,4 @@ if __name__ == "__main__":
     load_dotenv("../.env")
     
     print("🌉 Starting Real-time Kalshi Bridge on port 8001...")
-    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info")
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info", ws_per_message_deflate=False)
\ No newline at end of file
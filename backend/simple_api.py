@@ -11,13 +11,26 @@ import os
 from typing import Dict, List, Optional
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+import numpy as np
 import uvicorn
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, responses fall back to stdlib json
+    orjson = None
+
 # Import our simple client and cache
-from simple_kalshi_client import SimpleKalshiClient
+from simple_kalshi_client import SimpleKalshiClient, BatchedMarketFetcher
 from market_cache import SimpleMarketCache, get_cache, set_cache
 
-app = FastAPI(title="Simple Kalshi Terminal API", version="1.0.0")
+# /markets returns up to ~15k markets, so response encoding matters
+response_class = ORJSONResponse if orjson else JSONResponse
+app = FastAPI(
+    title="Simple Kalshi Terminal API",
+    version="1.0.0",
+    default_response_class=response_class
+)
 
 # Add CORS for UI development
 app.add_middleware(
@@ -30,8 +43,16 @@ app.add_middleware(
 
 # Global state
 kalshi_client: Optional[SimpleKalshiClient] = None
+market_fetcher: Optional[BatchedMarketFetcher] = None  # Batches /market/{ticker} lookups on kalshi_client
 use_mock_data = False
 
+# Short-lived response cache so clients polling the same data share one fetch
+MARKETS_CACHE_TTL = 1.0
+ORDERBOOK_CACHE_TTL = 0.5
+RESPONSE_CACHE_MAX_ENTRIES = 512
+_resp_cache: Dict[str, tuple] = {}  # key -> (expires_at, encoded body)
+_inflight: Dict[str, asyncio.Future] = {}  # key -> fetch shared by concurrent callers
+
 # Mock data for development
 MOCK_MARKETS = [
     {
@@ -69,6 +90,9 @@ MOCK_MARKETS = [
     }
 ]
 
+# Ticker lookup for the mock markets above
+MOCK_MARKETS_BY_TICKER = {m["ticker"]: m for m in MOCK_MARKETS}
+
 def generate_mock_orderbook(ticker: str) -> Dict:
     """Generate realistic mock orderbook data"""
     # Use ticker hash for consistent but varied data
@@ -95,10 +119,76 @@ def generate_mock_orderbook(ticker: str) -> Dict:
         "no": no_bids
     }
 
+def generate_mock_candlesticks(ticker: str, start_ts: int, end_ts: int, interval_seconds: int) -> List[Dict]:
+    """Generate mock OHLCV bars for a time range"""
+    # Build every bar at once with NumPy instead of hashing per bar in Python
+    ts = np.arange(start_ts, end_ts, interval_seconds, dtype=np.int64)
+    n = len(ts)
+    rng = np.random.default_rng(hash(ticker) & 0xFFFFFFFF)
+    
+    open_price = 50 + rng.integers(0, 40, n)
+    close_price = open_price + rng.integers(-5, 5, n)
+    high_price = np.maximum(open_price, close_price) + rng.integers(0, 5, n)
+    low_price = np.minimum(open_price, close_price) - rng.integers(0, 5, n)
+    volume = 100 + rng.integers(0, 500, n)
+    
+    # tolist() hands back plain ints so the response encoder needs no NumPy support
+    columns = zip(
+        ts.tolist(),
+        np.maximum(open_price, 1).tolist(),
+        np.maximum(high_price, 1).tolist(),
+        np.maximum(low_price, 1).tolist(),
+        np.maximum(close_price, 1).tolist(),
+        volume.tolist()
+    )
+    return [
+        {"ts": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in columns
+    ]
+
+async def _cached_response(key: str, ttl: float, load):
+    """Return a fresh cached response for key, or build it once for all concurrent callers"""
+    entry = _resp_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return Response(content=entry[1], media_type="application/json")
+    
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_render(load))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _store_response(key, ttl, done))
+    
+    # Shield so one caller disconnecting doesn't cancel the fetch the others are waiting on
+    content, body = await asyncio.shield(task)
+    return Response(content=body, media_type="application/json")
+
+async def _render(load):
+    """Run a loader and encode its result once"""
+    content = await load()
+    return content, response_class(content).body
+
+def _store_response(key: str, ttl: float, task: asyncio.Future):
+    """Cache a finished fetch unless it failed or fell back to an error payload"""
+    _inflight.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    content, body = task.result()
+    if "error" in content:
+        return
+    
+    # Searches make keys unbounded, so sweep expired entries once the cache grows
+    now = time.monotonic()
+    if len(_resp_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+        for stale in [k for k, (expires_at, _) in _resp_cache.items() if expires_at <= now]:
+            del _resp_cache[stale]
+        if len(_resp_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            _resp_cache.clear()
+    _resp_cache[key] = (now + ttl, body)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the API server"""
-    global kalshi_client, use_mock_data
+    global kalshi_client, market_fetcher, use_mock_data
     
     # Try to initialize Kalshi client
     api_key = os.getenv("KALSHI_API_KEY")
@@ -108,6 +198,7 @@ async def startup_event():
         try:
             kalshi_client = SimpleKalshiClient(api_key, private_key_path)
             await kalshi_client.__aenter__()
+            market_fetcher = BatchedMarketFetcher(kalshi_client)
             
             # Test connection
             test_data = await kalshi_client.get_markets(limit=1)
@@ -117,7 +208,8 @@ async def startup_event():
                 
                 # Initialize market cache
                 print("🚀 Starting market cache...")
-                cache = SimpleMarketCache(api_key, private_key_path)
+                # Share the API client so the cache doesn't open a second pool or reload the key
+                cache = SimpleMarketCache(api_key, private_key_path, client=kalshi_client)
                 await cache.start()
                 set_cache(cache)
                 print(f"✅ Market cache initialized with {cache.get_cache_info()['total_markets']} markets")
@@ -128,6 +220,7 @@ async def startup_event():
             print(f"⚠️  Kalshi API connection failed: {e}")
             print("📋 Falling back to mock data mode")
             use_mock_data = True
+            market_fetcher = None
             if kalshi_client:
                 await kalshi_client.__aexit__(None, None, None)
                 kalshi_client = None
@@ -177,6 +270,14 @@ async def get_markets(
     category: str = Query("all", description="Filter by category (all, politics, sports, crypto, weather)")
 ):
     """Get available markets"""
+    return await _cached_response(
+        f"markets:{limit}:{status}:{search}:{category}",
+        MARKETS_CACHE_TTL,
+        lambda: _load_markets(limit, status, search, category)
+    )
+
+async def _load_markets(limit: int, status: str, search: str, category: str) -> Dict:
+    """Build the /markets response"""
     try:
         # Try to use cache first
         cache = get_cache()
@@ -220,13 +321,30 @@ async def get_markets(
             "error": str(e)
         }
 
+@app.post("/markets/refresh")
+async def refresh_markets():
+    """Ask the market cache to reload now instead of at its next interval"""
+    cache = get_cache()
+    if not cache:
+        raise HTTPException(status_code=503, detail="Market cache not available")
+    
+    cache.refresh()
+    return {
+        "status": "refresh requested",
+        "cache_info": cache.get_cache_info()
+    }
+
 @app.get("/market/{ticker}")
 async def get_market(ticker: str):
     """Get specific market details"""
+    return await _cached_response(f"market:{ticker}", MARKETS_CACHE_TTL, lambda: _load_market(ticker))
+
+async def _load_market(ticker: str) -> Dict:
+    """Build the /market/{ticker} response"""
     try:
         if use_mock_data:
             # Return mock data
-            mock_market = next((m for m in MOCK_MARKETS if m["ticker"] == ticker), None)
+            mock_market = MOCK_MARKETS_BY_TICKER.get(ticker)
             if mock_market:
                 return {"market": mock_market, "mock_mode": True}
             else:
@@ -239,7 +357,7 @@ async def get_market(ticker: str):
             market_data = None
             if kalshi_client:
                 try:
-                    market_data = await kalshi_client.get_market(ticker)
+                    market_data = await market_fetcher.get_market(ticker)
                 except:
                     pass  # Fall back to cache search
             
@@ -265,7 +383,7 @@ async def get_market(ticker: str):
         
         # Fallback to direct API call
         if kalshi_client:
-            market_data = await kalshi_client.get_market(ticker)
+            market_data = await market_fetcher.get_market(ticker)
             if market_data:
                 return {"market": market_data, "mock_mode": False}
             else:
@@ -285,6 +403,14 @@ async def get_orderbook(
     depth: int = Query(10, description="Orderbook depth")
 ):
     """Get market orderbook"""
+    return await _cached_response(
+        f"orderbook:{ticker}:{depth}",
+        ORDERBOOK_CACHE_TTL,
+        lambda: _load_orderbook(ticker, depth)
+    )
+
+async def _load_orderbook(ticker: str, depth: int) -> Dict:
+    """Build the /market/{ticker}/orderbook response"""
     try:
         if use_mock_data:
             # Return mock orderbook
@@ -335,29 +461,9 @@ async def get_candlesticks(
         
         if use_mock_data or not kalshi_client:
             # Generate mock candlestick data
-            interval_seconds = period_interval * 60
-            candlesticks = []
-            current_ts = start_ts
-            
-            while current_ts < end_ts:
-                seed = hash(ticker + str(current_ts))
-                base_price = 50 + (seed % 40)
-                
-                open_price = base_price
-                close_price = base_price + ((seed % 10) - 5)
-                high_price = max(open_price, close_price) + (abs(seed) % 5)
-                low_price = min(open_price, close_price) - (abs(seed) % 5)
-                volume = 100 + (abs(seed) % 500)
-                
-                candlesticks.append({
-                    "ts": current_ts,
-                    "open": max(1, open_price),
-                    "high": max(1, high_price), 
-                    "low": max(1, low_price),
-                    "close": max(1, close_price),
-                    "volume": volume
-                })
-                current_ts += interval_seconds
+            candlesticks = generate_mock_candlesticks(
+                ticker, start_ts, end_ts, period_interval * 60
+            )
             
             return {
                 "candlesticks": candlesticks,
@@ -10,11 +10,18 @@ import json
 import time
 import base64
 import os
+import ssl
 from typing import Dict, List, Optional
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.backends import default_backend
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional, stdlib json parses the same responses
+    _json_loads = json.loads
+
 
 class SimpleKalshiAuth:
     """Simple authentication handler for Kalshi API"""
@@ -22,6 +29,18 @@ class SimpleKalshiAuth:
     def __init__(self, api_key_id: str, private_key_path: str):
         self.api_key_id = api_key_id
         self.private_key = self._load_private_key(private_key_path)
+        
+        # Signing parameters never change, so build them once
+        self._padding = padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.DIGEST_LENGTH
+        )
+        self._hash = hashes.SHA256()
+        
+        # Signatures only depend on (timestamp_ms, method, path), so requests
+        # issued within the same millisecond can share headers
+        self._headers_cache: Dict[tuple, Dict[str, str]] = {}
+        self._headers_cache_ts = 0
     
     def _load_private_key(self, key_path: str):
         """Load private key from PEM file"""
@@ -34,29 +53,90 @@ class SimpleKalshiAuth:
     
     def _sign_message(self, message: str) -> str:
         """Sign message with private key"""
-        message_bytes = message.encode('utf-8')
         signature = self.private_key.sign(
-            message_bytes,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.DIGEST_LENGTH
-            ),
-            hashes.SHA256()
+            message.encode('utf-8'),
+            self._padding,
+            self._hash
         )
         return base64.b64encode(signature).decode('utf-8')
     
-    def create_headers(self, method: str, path: str) -> Dict[str, str]:
-        """Create authentication headers for REST API"""
-        timestamp = str(int(time.time() * 1000))  # milliseconds
-        message = f"{timestamp}{method}{path.split('?')[0]}"
-        signature = self._sign_message(message)
-        
+    def _cached_headers(self, timestamp_ms: int, method: str, path: str) -> Optional[Dict[str, str]]:
+        """Return headers already signed this millisecond, if any"""
+        # Drop headers signed in a previous millisecond
+        if timestamp_ms != self._headers_cache_ts:
+            self._headers_cache.clear()
+            self._headers_cache_ts = timestamp_ms
+        return self._headers_cache.get((method, path))
+    
+    def _signed_headers(self, timestamp_ms: int, method: str, path: str) -> Dict[str, str]:
+        """Sign headers for a request; runs in a worker thread, so it leaves the cache alone"""
+        timestamp = str(timestamp_ms)
+        signature = self._sign_message(f"{timestamp}{method}{path}")
         return {
             "KALSHI-ACCESS-KEY": self.api_key_id,
             "KALSHI-ACCESS-SIGNATURE": signature,
             "KALSHI-ACCESS-TIMESTAMP": timestamp,
             "Content-Type": "application/json"
         }
+    
+    async def create_headers_async(self, method: str, path: str) -> Dict[str, str]:
+        """Create authentication headers, signing in a worker thread on a cache miss"""
+        timestamp_ms = time.time_ns() // 1_000_000  # milliseconds
+        path = path.split('?')[0]
+        
+        headers = self._cached_headers(timestamp_ms, method, path)
+        if headers is None:
+            # RSA signing takes ~1 ms of CPU; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            headers = await loop.run_in_executor(
+                None, self._signed_headers, timestamp_ms, method, path
+            )
+            # The cache is only touched on the event loop; skip it if the millisecond has moved on
+            if timestamp_ms == self._headers_cache_ts:
+                self._headers_cache[(method, path)] = headers
+        return headers
+
+
+# One connection pool for every client in the process, closed when the last client exits
+_shared_session: Optional[aiohttp.ClientSession] = None
+_session_refs = 0
+_ssl_context = ssl.create_default_context()
+
+
+def _acquire_session() -> aiohttp.ClientSession:
+    """Return the shared session, creating it on first use"""
+    global _shared_session, _session_refs
+    
+    if _shared_session is None or _shared_session.closed:
+        # Keep a small pool of warm connections so paginated and repeated calls
+        # reuse TCP/TLS sessions instead of re-handshaking
+        connector = aiohttp.TCPConnector(
+            limit=16,
+            limit_per_host=10,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+            enable_cleanup_closed=True,
+            ssl=_ssl_context
+        )
+        _shared_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30, connect=3)
+        )
+    
+    _session_refs += 1
+    return _shared_session
+
+
+async def _release_session():
+    """Drop a reference to the shared session, closing it after the last one"""
+    global _shared_session, _session_refs
+    
+    _session_refs -= 1
+    if _session_refs <= 0:
+        _session_refs = 0
+        if _shared_session is not None:
+            await _shared_session.close()
+            _shared_session = None
 
 
 class SimpleKalshiClient:
@@ -66,33 +146,49 @@ class SimpleKalshiClient:
         self.auth = SimpleKalshiAuth(api_key_id, private_key_path)
         self.base_url = "https://api.elections.kalshi.com"
         self.session: Optional[aiohttp.ClientSession] = None
+        
+        # Slow orderbook/candlestick requests get a duplicate after hedge_delay seconds,
+        # for at most hedge_budget of requests
+        self.hedge_delay = 0.2
+        self.hedge_budget = 0.05
+        self._hedge_requests = 0
+        self._hedges_sent = 0
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = _acquire_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
-            await self.session.close()
+            self.session = None
+            await _release_session()
     
-    async def get_markets(self, limit: int = 100, status: str = "open", cursor: str = None) -> Dict:
-        """Get markets from Kalshi API with cursor support"""
+    async def get_markets(self, limit: int = 100, status: Optional[str] = "open", cursor: str = None,
+                          tickers: Optional[List[str]] = None) -> Dict:
+        """Get markets from Kalshi API with cursor support, optionally restricted to specific tickers"""
         if not self.session:
             raise RuntimeError("Client not initialized. Use async with.")
         
         path = "/trade-api/v2/markets"
         url = f"{self.base_url}{path}"
-        params = {"limit": limit, "status": status}
+        params = {"limit": limit}
+        
+        # Omit status to match markets in any state
+        if status:
+            params["status"] = status
         
         # Add cursor if provided
         if cursor:
             params["cursor"] = cursor
         
-        headers = self.auth.create_headers("GET", path)
+        if tickers:
+            params["tickers"] = ",".join(tickers)
+        
+        headers = await self.auth.create_headers_async("GET", path)
         
         async with self.session.get(url, params=params, headers=headers) as response:
             response.raise_for_status()
-            return await response.json()
+            return await response.json(loads=_json_loads)
     
     async def get_market(self, ticker: str) -> Optional[Dict]:
         """Get specific market by ticker"""
@@ -102,12 +198,12 @@ class SimpleKalshiClient:
         path = f"/trade-api/v2/markets/{ticker}"
         url = f"{self.base_url}{path}"
         
-        headers = self.auth.create_headers("GET", path)
+        headers = await self.auth.create_headers_async("GET", path)
         
         try:
             async with self.session.get(url, headers=headers) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=_json_loads)
                     return data.get("market")
                 return None
         except Exception as e:
@@ -145,15 +241,15 @@ class SimpleKalshiClient:
         if end_ts:
             params["end_ts"] = end_ts
         
-        headers = self.auth.create_headers("GET", path)
+        headers = await self.auth.create_headers_async("GET", path)
         
         try:
-            async with self.session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    print(f"Candlesticks API error {response.status}: {await response.text()}")
-                    return None
+            status, body = await self._hedged_get(url, params, headers)
+            if status == 200:
+                return body
+            else:
+                print(f"Candlesticks API error {status}: {body}")
+                return None
         except Exception as e:
             print(f"Error getting candlesticks for {ticker}: {e}")
             return None
@@ -167,16 +263,106 @@ class SimpleKalshiClient:
         url = f"{self.base_url}{path}"
         params = {"depth": depth}
         
-        headers = self.auth.create_headers("GET", path)
+        headers = await self.auth.create_headers_async("GET", path)
         
         try:
-            async with self.session.get(url, params=params, headers=headers) as response:
-                response.raise_for_status()
-                data = await response.json()
-                return data.get("orderbook")
+            status, body = await self._hedged_get(url, params, headers)
+            if status != 200:
+                print(f"Error fetching orderbook for {ticker}: HTTP {status}")
+                return None
+            return body.get("orderbook")
         except Exception as e:
             print(f"Error fetching orderbook for {ticker}: {e}")
             return None
+    
+    async def _get_once(self, url: str, params: Dict, headers: Dict) -> tuple:
+        """GET a URL and return (status, parsed JSON on 200 or response text otherwise)"""
+        async with self.session.get(url, params=params, headers=headers) as response:
+            if response.status == 200:
+                return response.status, await response.json(loads=_json_loads)
+            return response.status, await response.text()
+    
+    async def _hedged_get(self, url: str, params: Dict, headers: Dict) -> tuple:
+        """GET a URL, racing a duplicate request if the first is slow and the hedge budget allows"""
+        self._hedge_requests += 1
+        if self._hedge_requests >= 1000:
+            # Halve both counters so the budget tracks recent traffic
+            self._hedge_requests //= 2
+            self._hedges_sent //= 2
+        
+        tasks = {asyncio.ensure_future(self._get_once(url, params, headers))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if not done and self._hedges_sent < self.hedge_budget * self._hedge_requests:
+                self._hedges_sent += 1
+                tasks.add(asyncio.ensure_future(self._get_once(url, params, headers)))
+            
+            # First successful response wins; fail only if every attempt failed
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+class BatchedMarketFetcher:
+    """Coalesce concurrent single-market lookups into batched /markets requests"""
+    
+    def __init__(self, client: SimpleKalshiClient, linger: float = 0.005, max_batch: int = 50):
+        self.client = client
+        self.linger = linger  # Seconds to wait for more lookups before sending a batch
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._fetches = set()  # Keep references to in-flight batch tasks
+    
+    async def get_market(self, ticker: str) -> Optional[Dict]:
+        """Get a market by ticker, sharing one request with other lookups made within the linger window"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(ticker, []).append(future)
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.linger, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Send every pending lookup as one batch"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._fetch(batch))
+            self._fetches.add(task)
+            task.add_done_callback(self._fetches.discard)
+    
+    async def _fetch(self, batch: Dict[str, List[asyncio.Future]]):
+        """Fetch a batch of tickers and resolve their lookups"""
+        try:
+            # No status filter, so closed and settled markets resolve like single lookups do
+            data = await self.client.get_markets(limit=len(batch), status=None, tickers=list(batch))
+            markets = {market["ticker"]: market for market in data.get("markets", [])}
+        except Exception as e:
+            print(f"Error fetching markets {', '.join(batch)}: {e}")
+            markets = {}
+        
+        # Unknown tickers resolve to None, like SimpleKalshiClient.get_market
+        for ticker, futures in batch.items():
+            market = markets.get(ticker)
+            for future in futures:
+                if not future.done():
+                    future.set_result(market)
 
 
 async def test_client():
@@ -5,6 +5,7 @@ Only handles WebSocket connection and basic subscriptions
 """
 
 import asyncio
+import itertools
 import json
 import time
 import base64
@@ -15,6 +16,16 @@ from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.backends import default_backend
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:  # orjson is optional, stdlib json handles the same frames
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 
 class SimpleKalshiWebSocketAuth:
     """Simple WebSocket authentication for Kalshi"""
@@ -22,6 +33,13 @@ class SimpleKalshiWebSocketAuth:
     def __init__(self, api_key_id: str, private_key_path: str):
         self.api_key_id = api_key_id
         self.private_key = self._load_private_key(private_key_path)
+        
+        # Signing parameters never change, so build them once
+        self._padding = padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.DIGEST_LENGTH
+        )
+        self._hash = hashes.SHA256()
     
     def _load_private_key(self, key_path: str):
         """Load private key from PEM file"""
@@ -37,11 +55,8 @@ class SimpleKalshiWebSocketAuth:
         message_bytes = message.encode('utf-8')
         signature = self.private_key.sign(
             message_bytes,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.DIGEST_LENGTH
-            ),
-            hashes.SHA256()
+            self._padding,
+            self._hash
         )
         return base64.b64encode(signature).decode('utf-8')
     
@@ -71,10 +86,15 @@ class SimpleKalshiWebSocketClient:
     def __init__(self, api_key_id: str, private_key_path: str):
         self.auth = SimpleKalshiWebSocketAuth(api_key_id, private_key_path)
         self.ws_url = "wss://api.elections.kalshi.com/trade-api/ws/v2"
-        self.websocket: Optional[websockets.WebSocketServerProtocol] = None
-        self.message_id = 1
+        self.websocket: Optional[websockets.ClientConnection] = None
+        self._next_id = itertools.count(1).__next__
         self.subscriptions = []
         
+        # Received messages are queued for on_message so a slow handler never
+        # stalls the socket; a full queue pauses the receive loop instead of
+        # dropping messages, since a lost orderbook delta corrupts the book
+        self.rx_queue_size = 1024
+        
         # Callbacks
         self.on_message: Optional[Callable] = None
         self.on_connected: Optional[Callable] = None
@@ -84,14 +104,23 @@ class SimpleKalshiWebSocketClient:
     async def connect(self) -> bool:
         """Connect to Kalshi WebSocket"""
         try:
-            headers = self.auth.create_ws_headers()
+            # Sign in a worker thread so the event loop keeps running
+            loop = asyncio.get_running_loop()
+            headers = await loop.run_in_executor(None, self.auth.create_ws_headers)
             print(f"Connecting to Kalshi WebSocket: {self.ws_url}")
             
             self.websocket = await websockets.connect(
                 self.ws_url,
                 additional_headers=headers,
                 ping_interval=30,
-                ping_timeout=10
+                ping_timeout=10,
+                # Frames are small JSON; deflate costs more CPU than it saves
+                compression=None,
+                max_size=2**19,
+                # Buffer no more frames than the rx queue holds, so a backed-up
+                # handler pushes back through TCP instead of piling up here
+                max_queue=self.rx_queue_size,
+                write_limit=2**17
             )
             
             print("✅ WebSocket connected successfully")
@@ -121,10 +150,9 @@ class SimpleKalshiWebSocketClient:
         if not self.websocket:
             raise RuntimeError("WebSocket not connected")
         
-        message["id"] = self.message_id
-        self.message_id += 1
+        message["id"] = self._next_id()
         
-        message_str = json.dumps(message)
+        message_str = _json_dumps(message)
         print(f"📤 Sending: {message_str}")
         
         await self.websocket.send(message_str)
@@ -177,14 +205,26 @@ class SimpleKalshiWebSocketClient:
         
         print("👂 Listening for messages...")
         
+        # Bind per-message lookups once for the receive loop
+        loads = _json_loads
+        queue = asyncio.Queue(maxsize=self.rx_queue_size)
+        enqueue = queue.put
+        recv = self.websocket.recv
+        worker = None
+        if self.on_message:
+            worker = asyncio.create_task(self._rx_worker(queue, self.on_message))
+        
         try:
-            async for message in self.websocket:
+            while True:
+                # Take text frames as raw UTF-8 bytes; the decoder parses them
+                # directly, so skip the intermediate str decode
+                message = await recv(decode=False)
                 try:
-                    data = json.loads(message)
-                    print(f"📥 Received: {json.dumps(data, indent=2)}")
+                    data = loads(message)
+                    print(f"📥 Received: {data.get('type')}")
                     
-                    if self.on_message:
-                        await self.on_message(data)
+                    if worker:
+                        await enqueue(data)
                         
                 except json.JSONDecodeError as e:
                     print(f"❌ Invalid JSON received: {message}, error: {e}")
@@ -193,12 +233,32 @@ class SimpleKalshiWebSocketClient:
                     
         except websockets.exceptions.ConnectionClosed:
             print("🔌 WebSocket connection closed")
+            # Handle everything already received before reporting the close
+            if worker:
+                await queue.join()
             if self.on_disconnected:
                 await self.on_disconnected()
         except Exception as e:
             print(f"❌ WebSocket error: {e}")
+            if worker:
+                await queue.join()
             if self.on_error:
                 await self.on_error(e)
+        finally:
+            if worker:
+                worker.cancel()
+    
+    async def _rx_worker(self, queue: asyncio.Queue, on_message: Callable):
+        """Run on_message for queued messages, off the receive loop"""
+        get = queue.get
+        while True:
+            data = await get()
+            try:
+                await on_message(data)
+            except Exception as e:
+                print(f"❌ Error processing message: {e}")
+            finally:
+                queue.task_done()
 
 
 async def test_websocket_client():
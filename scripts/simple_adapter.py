@@ -3,6 +3,7 @@
 Simple working Kalshi adapter based on proven WebSocket test
 """
 import asyncio
+import itertools
 import json
 import logging
 import os
@@ -18,12 +19,21 @@ class SimpleKalshiAdapter:
         self.auth = KalshiAuth(api_key_id, private_key_path)
         self.ws_url = "wss://api.elections.kalshi.com/trade-api/ws/v2"
         self.websocket = None
-        self.message_id = 1
+        self._next_id = itertools.count(1).__next__
         self.running = False
         
         # Test markets
         self.test_markets = ["KXUSAINTEL-25", "KXSENATESCR-26-PDANS"]
         
+        # Message type -> log handler
+        self._log_handlers = {
+            "orderbook_snapshot": self._log_snapshot,
+            "orderbook_delta": self._log_delta,
+            "ticker": self._log_ticker,
+            "subscribed": self._log_subscribed,
+            "error": self._log_error
+        }
+        
     async def start(self):
         """Start the simplified adapter"""
         self.running = True
@@ -51,31 +61,32 @@ class SimpleKalshiAdapter:
             self.ws_url,
             additional_headers=headers,
             ping_interval=30,
-            ping_timeout=10
+            ping_timeout=10,
+            compression=None,
+            max_size=2**19
         )
         logger.info("✅ Connected to Kalshi WebSocket")
     
     async def subscribe_to_test_markets(self):
         """Subscribe to orderbook updates for test markets"""
-        for market in self.test_markets:
-            subscription = {
-                "id": self.message_id,
-                "cmd": "subscribe",
-                "params": {
-                    "channels": ["orderbook_delta"],
-                    "market_ticker": market
-                }
+        # One frame covers every market instead of one frame (and sleep) per ticker
+        subscription = {
+            "id": self._next_id(),
+            "cmd": "subscribe",
+            "params": {
+                "channels": ["orderbook_delta"],
+                "market_tickers": self.test_markets
             }
-            
-            await self.websocket.send(json.dumps(subscription))
-            logger.info(f"📡 Subscribed to {market}")
-            self.message_id += 1
-            await asyncio.sleep(0.1)
+        }
+        
+        await self.websocket.send(json.dumps(subscription))
+        logger.info(f"📡 Subscribed to {self.test_markets}")
     
     async def listen_for_data(self):
         """Listen for incoming data and log it"""
         message_count = 0
         last_status_time = 0
+        log_handlers = self._log_handlers
         
         while self.running:
             try:
@@ -83,40 +94,16 @@ class SimpleKalshiAdapter:
                 data = json.loads(message)
                 message_count += 1
                 
-                msg_type = data.get("type", "unknown")
-                
                 # Log different message types
-                if msg_type == "orderbook_snapshot":
-                    market = data.get("msg", {}).get("market_ticker", "unknown")
-                    yes_bids = len(data.get("msg", {}).get("yes", []))
-                    no_bids = len(data.get("msg", {}).get("no", []))
-                    logger.info(f"📊 SNAPSHOT: {market} - {yes_bids} yes bids, {no_bids} no bids")
-                    
-                elif msg_type == "orderbook_delta":
-                    market = data.get("msg", {}).get("market_ticker", "unknown")
-                    price = data.get("msg", {}).get("price", 0)
-                    delta = data.get("msg", {}).get("delta", 0)
-                    side = data.get("msg", {}).get("side", "unknown")
-                    logger.info(f"🔄 DELTA: {market} - {side} @ {price}¢ Δ{delta}")
-                    
-                elif msg_type == "ticker":
-                    market = data.get("msg", {}).get("market_ticker", "unknown")
-                    bid = data.get("msg", {}).get("bid")
-                    ask = data.get("msg", {}).get("ask")
-                    if market in self.test_markets:
-                        logger.info(f"📈 TICKER: {market} - Bid: {bid}¢, Ask: {ask}¢")
-                    
-                elif msg_type == "subscribed":
-                    channel = data.get("msg", {}).get("channel", "unknown")
-                    logger.info(f"✅ SUBSCRIBED to {channel}")
-                    
-                elif msg_type == "error":
-                    logger.error(f"❌ ERROR: {data.get('msg', {})}")
+                handler = log_handlers.get(data.get("type", "unknown"))
+                if handler:
+                    handler(data.get("msg") or {})
                 
                 # Status update every 10 seconds
-                if time.time() - last_status_time > 10:
+                now = time.monotonic()
+                if now - last_status_time > 10:
                     logger.info(f"📡 Status: {message_count} messages received, adapter running...")
-                    last_status_time = time.time()
+                    last_status_time = now
                 
             except websockets.exceptions.ConnectionClosed:
                 logger.warning("WebSocket disconnected")
@@ -124,6 +111,38 @@ class SimpleKalshiAdapter:
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
     
+    def _log_snapshot(self, msg: dict):
+        """Log an orderbook snapshot"""
+        market = msg.get("market_ticker", "unknown")
+        yes_bids = len(msg.get("yes") or [])
+        no_bids = len(msg.get("no") or [])
+        logger.info(f"📊 SNAPSHOT: {market} - {yes_bids} yes bids, {no_bids} no bids")
+    
+    def _log_delta(self, msg: dict):
+        """Log an orderbook delta"""
+        market = msg.get("market_ticker", "unknown")
+        price = msg.get("price", 0)
+        delta = msg.get("delta", 0)
+        side = msg.get("side", "unknown")
+        logger.info(f"🔄 DELTA: {market} - {side} @ {price}¢ Δ{delta}")
+    
+    def _log_ticker(self, msg: dict):
+        """Log a ticker update for a test market"""
+        market = msg.get("market_ticker", "unknown")
+        bid = msg.get("bid")
+        ask = msg.get("ask")
+        if market in self.test_markets:
+            logger.info(f"📈 TICKER: {market} - Bid: {bid}¢, Ask: {ask}¢")
+    
+    def _log_subscribed(self, msg: dict):
+        """Log a subscription confirmation"""
+        channel = msg.get("channel", "unknown")
+        logger.info(f"✅ SUBSCRIBED to {channel}")
+    
+    def _log_error(self, msg: dict):
+        """Log an error message"""
+        logger.error(f"❌ ERROR: {msg}")
+    
     async def close(self):
         """Close WebSocket connection"""
         self.running = False
@@ -149,4 +168,11 @@ async def main():
         await adapter.close()
 
 if __name__ == "__main__":
+    # uvloop ships with uvicorn[standard]; fall back to the default loop without it
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())
\ No newline at end of file
@@ -8,12 +8,28 @@ import asyncio
 import json
 import time
 import random
-from typing import Set
+from typing import Dict
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 
-app = FastAPI(title="Simple WebSocket Server", version="1.0.0")
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:  # orjson is optional, stdlib json handles the same messages
+    orjson = None
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+app = FastAPI(
+    title="Simple WebSocket Server",
+    version="1.0.0",
+    default_response_class=ORJSONResponse if orjson else JSONResponse
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,7 +40,10 @@ app.add_middleware(
 )
 
 # Global state
-websocket_connections: Set[WebSocket] = set()
+# Each client gets a bounded outbound queue drained by its own writer task
+CLIENT_QUEUE_SIZE = 1024
+MAX_BATCH_SIZE = 128
+client_queues: Dict[WebSocket, asyncio.Queue] = {}
 mock_markets = [
     "KXAPRPOTUS-25AUG22-46.5",
     "KXAPRPOTUS-25AUG22-46.3", 
@@ -99,23 +118,39 @@ async def generate_mock_trade():
         }
     }
 
+def _enqueue(queue: asyncio.Queue, message_str: str):
+    """Queue a message for a client, dropping its oldest message when full"""
+    try:
+        queue.put_nowait(message_str)
+    except asyncio.QueueFull:
+        queue.get_nowait()
+        queue.put_nowait(message_str)
+
+async def _client_writer(websocket: WebSocket, queue: asyncio.Queue):
+    """Send queued messages to a single client until it disconnects"""
+    try:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < MAX_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            # Messages that piled up while sending go out together in one frame
+            if len(batch) == 1:
+                await websocket.send_text(batch[0])
+            else:
+                await websocket.send_text('{"type":"batch","events":[' + ",".join(batch) + ']}')
+    except Exception:
+        pass
+
 async def broadcast_to_all(message: dict):
     """Broadcast message to all connected WebSocket clients"""
-    if not websocket_connections:
+    if not client_queues:
         return
     
-    message_str = json.dumps(message)
-    disconnected = []
-    
-    for websocket in websocket_connections.copy():
-        try:
-            await websocket.send_text(message_str)
-        except Exception:
-            disconnected.append(websocket)
-    
-    # Remove disconnected clients
-    for websocket in disconnected:
-        websocket_connections.discard(websocket)
+    # Enqueue only; each client's writer sends at its own pace
+    message_str = _json_dumps(message)
+    for queue in client_queues.values():
+        _enqueue(queue, message_str)
 
 async def mock_data_generator():
     """Background task to generate mock real-time data"""
@@ -149,9 +184,11 @@ async def mock_data_generator():
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time data"""
     await websocket.accept()
-    websocket_connections.add(websocket)
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    client_queues[websocket] = queue
+    writer = asyncio.create_task(_client_writer(websocket, queue))
     
-    print(f"📡 Client connected. Total connections: {len(websocket_connections)}")
+    print(f"📡 Client connected. Total connections: {len(client_queues)}")
     
     # Send welcome message
     welcome = {
@@ -162,7 +199,7 @@ async def websocket_endpoint(websocket: WebSocket):
             "available_markets": mock_markets
         }
     }
-    await websocket.send_text(json.dumps(welcome))
+    _enqueue(queue, _json_dumps(welcome))
     
     try:
         # Keep connection alive and handle client messages
@@ -170,7 +207,7 @@ async def websocket_endpoint(websocket: WebSocket):
             try:
                 # Wait for client messages (subscriptions, etc.)
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                message = _json_loads(data)
                 
                 # Handle subscription requests
                 if message.get("type") == "subscribe":
@@ -184,7 +221,7 @@ async def websocket_endpoint(websocket: WebSocket):
                             "message": f"Subscribed to {channels}"
                         }
                     }
-                    await websocket.send_text(json.dumps(response))
+                    _enqueue(queue, _json_dumps(response))
                     
                     print(f"📋 Client subscribed to: {channels}")
                 
@@ -197,8 +234,9 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         pass
     finally:
-        websocket_connections.discard(websocket)
-        print(f"📤 Client disconnected. Total connections: {len(websocket_connections)}")
+        client_queues.pop(websocket, None)
+        writer.cancel()
+        print(f"📤 Client disconnected. Total connections: {len(client_queues)}")
 
 @app.get("/")
 async def root():
@@ -207,7 +245,7 @@ async def root():
         "message": "Simple WebSocket Server",
         "version": "1.0.0",
         "websocket_endpoint": "/ws",
-        "connected_clients": len(websocket_connections),
+        "connected_clients": len(client_queues),
         "mock_markets": mock_markets
     }
 
@@ -223,4 +261,4 @@ async def startup_event():
 
 if __name__ == "__main__":
     print("🔌 Starting Simple WebSocket Server on port 8001...")
-    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info")
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info", ws_per_message_deflate=False)
\ No newline at end of file